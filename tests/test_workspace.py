@@ -1,7 +1,9 @@
+import json
 from pathlib import Path
-from os import chdir
+from os import chdir, pipe, close
+from threading import Thread
 from difflib import unified_diff
-from pytest import fixture
+from pytest import fixture, raises
 from ocrd_utils import pushd_popd
 from ocrd import Resolver
 from ocrd_models.ocrd_page import parseEtree
@@ -56,3 +58,65 @@ def test_api(workspace_path, tmpdir):
         target_xml = ET.tostring(target_tree, pretty_print=True, encoding='UTF-8').decode('utf-8')
         result_xml = ET.tostring(result_tree, pretty_print=True, encoding='UTF-8').decode('utf-8')
         assert result_xml == target_xml, path
+
+
+def xml_without_metadata(xml_path):
+    """Serialize a PAGE-XML file without its date-bearing Metadata children."""
+    _, tree, _, _ = parseEtree(xml_path, silence=True)
+    for meta in tree.xpath("/page:PcGts/page:Metadata/*", namespaces=NS):
+        meta.getparent().remove(meta)
+    return ET.tostring(tree, pretty_print=True, encoding='UTF-8').decode('utf-8')
+
+def test_pipe_input(workspace_path, tmpdir):
+    json_path = Path("textract_responses") / "Ansiedlung_WD_Wielun_Lentschütz_0053.json"
+    img_path = Path("images") / "Ansiedlung_WD_Wielun_Lentschütz_0053.tif"
+    convert_file(str(json_path), str(img_path), str(tmpdir / "file.xml"))
+    # feed the response through a pipe, like `<(cat response.json)` in a shell
+    read_fd, write_fd = pipe()
+    def feed():
+        with open(write_fd, "wb") as pipe_in:
+            pipe_in.write(json_path.read_bytes())
+    writer = Thread(target=feed)
+    writer.start()
+    try:
+        convert_file(f"/dev/fd/{read_fd}", str(img_path), str(tmpdir / "pipe.xml"))
+    finally:
+        # close the reading end first, so the writer cannot block on a full pipe
+        close(read_fd)
+        writer.join()
+    assert xml_without_metadata(tmpdir / "pipe.xml") == xml_without_metadata(tmpdir / "file.xml")
+
+def test_empty_input(workspace_path, tmpdir):
+    json_path = tmpdir / "empty.json"
+    json_path.write("")
+    with raises(json.JSONDecodeError):
+        convert_file(str(json_path), str(Path("images") / "nowa_doba.jpg"), str(tmpdir / "empty.xml"))
+
+def test_dangling_word(workspace_path, tmpdir):
+    # derive a response with a word outside any LINE, CELL or LAYOUT
+    aws_json = json.loads((Path("textract_responses") / "nowa_doba.json").read_bytes())
+    line_block = next(block for block in aws_json["Blocks"] if block["BlockType"] == "LINE")
+    line_children = next(rel for rel in line_block["Relationships"] if rel["Type"] == "CHILD")
+    word_id = line_children["Ids"].pop()
+    json_path = tmpdir / "dangling_word.json"
+    json_path.write(json.dumps(aws_json))
+    xml_path = tmpdir / "dangling_word.xml"
+    convert_file(str(json_path), str(Path("images") / "nowa_doba.jpg"), str(xml_path))
+    _, result_tree, _, _ = parseEtree(xml_path, silence=True)
+    # the word gets a dummy line, which gets a dummy region
+    line = result_tree.find(
+        f".//page:TextLine[@id='textract-line_{word_id}_parent']", namespaces=NS
+    )
+    assert line is not None
+    assert [word.get("id") for word in line.findall("page:Word", namespaces=NS)] == [
+        f"textract-word_{word_id}"
+    ]
+    region = line.getparent()
+    region_id = f"textract-layout-dummy_{word_id}_parent_parent"
+    assert region.tag == f"{{{NS['page']}}}TextRegion"
+    assert region.get("id") == region_id
+    assert region.get("type") == "floating"
+    assert region.get("custom") is None
+    assert result_tree.xpath(
+        "//page:ReadingOrder//page:RegionRefIndexed/@regionRef", namespaces=NS
+    ).count(region_id) == 1
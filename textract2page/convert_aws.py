@@ -1,16 +1,21 @@
 """Convert an AWS Textract response to PRIMA Page XML."""
 
 import json
+import logging
 import math
 import sys
 import warnings
 from typing import List, Dict
 from dataclasses import dataclass
-from functools import singledispatch
 from datetime import datetime
+from itertools import chain
 from abc import ABC, abstractmethod
 from PIL import Image
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from ocrd_utils import VERSION
 from ocrd_models.ocrd_page import (
@@ -36,6 +41,9 @@ from ocrd_models.ocrd_page import (
 from ocrd_models.ocrd_page import to_xml
 
 
+LOG = logging.getLogger(__name__)
+
+CREATOR = f"OCR-D/core {VERSION}"
 TEXT_TYPE_MAP = {"PRINTED": "printed", "HANDWRITING": "handwritten-cursive"}
 LAYOUT_TYPE_MAP = {
     "LAYOUT_TITLE": "heading",
@@ -49,16 +57,41 @@ LAYOUT_TYPE_MAP = {
     "LAYOUT_KEY_VALUE_SET": "other",
     "LAYOUT_TEXT": "paragraph",
 }
+# Textract layout types -> PAGE @custom
+LAYOUT_CUSTOM_MAP = {
+    layout_type: f"textract-layout-type: {layout_type.split('LAYOUT_')[1].lower()};"
+    for layout_type in LAYOUT_TYPE_MAP
+}
+# TextractCell flag attribute -> cell type (also the output order of get_cell_types())
+CELL_TYPE_MAP = {
+    "table_footer": "table_footer",
+    "table_title": "table_title",
+    "table_section_title": "section_title",
+    "table_summary": "table_summary",
+    "column_header": "column_header",
+}
 
 
 class TextractGeometry(ABC):
     """Abstract geometry class."""
 
+    __slots__ = ()
+
+    def to_points(self, page_width: int, page_height: int) -> str:
+        """Convert this geometry into a string of points, which are
+        scaled to the image width and height."""
+
+        raise NotImplementedError(
+            f"Cannot process this type of data ({type(self)})"
+        )
+
 
 @dataclass
 class TextractPoint(TextractGeometry):
     """Point class for creation of geometries."""
 
+    __slots__ = ("x", "y")
+
     x: float
     y: float
 
@@ -71,6 +104,8 @@ class TextractPoint(TextractGeometry):
 class TextractBoundingBox(TextractGeometry):
     """Bounding box class to handle bounding box geometries detected by AWS Textract."""
 
+    __slots__ = ("left", "top", "width", "height")
+
     left: float
     top: float
     width: float
@@ -81,48 +116,98 @@ class TextractBoundingBox(TextractGeometry):
         self.top = bbox_dict.get("Top", -1)
         self.width = bbox_dict.get("Width", -1)
         self.height = bbox_dict.get("Height", -1)
-        self.__post_init__()
+        if __debug__:
+            self.__post_init__()
 
     def __post_init__(self):
-        assert 0 <= self.left <= 1, self
-        assert 0 <= self.top <= 1, self
-        assert 0 <= self.width <= 1, self
-        assert 0 <= self.height <= 1, self
-        assert self.width + self.left <= 1, self
-        assert self.height + self.top <= 1, self
+        assert (
+            0 <= self.left <= 1
+            and 0 <= self.top <= 1
+            and 0 <= self.width <= 1
+            and 0 <= self.height <= 1
+            and self.width + self.left <= 1
+            and self.height + self.top <= 1
+        ), self
+
+    def to_points(self, page_width: int, page_height: int) -> str:
+        """Convert this bounding box into a string of points in the order
+        top,left top,right bottom,right bottom,left.
+        """
+
+        x1 = math.ceil(self.left * page_width)
+        y1 = math.ceil(self.top * page_height)
+        x2 = math.ceil((self.left + self.width) * page_width)
+        y2 = math.ceil((self.top + self.height) * page_height)
+
+        points = f"{x1},{y1} {x2},{y1} {x2},{y2} {x1},{y2}"
+
+        return points
 
 
 @dataclass
 class TextractPolygon(TextractGeometry):
-    """Polygon class to handle polygon geometries detected by AWS Textract."""
+    """Polygon class to handle polygon geometries detected by AWS Textract.
+
+    The point coordinates are stored as two parallel lists `xs` and `ys`
+    (instead of one object per point)."""
 
-    points: List[TextractPoint]
+    __slots__ = ("xs", "ys")
+
+    xs: List[float]
+    ys: List[float]
 
     def __init__(self, polygon: List[Dict[str, float]]):
-        self.points = [
-            TextractPoint(point.get("X", -1), point.get("Y", -1)) for point in polygon
-        ]
-        self.__post_init__()
+        self.xs = [point.get("X", -1) for point in polygon]
+        self.ys = [point.get("Y", -1) for point in polygon]
+        if __debug__:
+            self.__post_init__()
 
     def __post_init__(self):
-        assert len(self.points) >= 3, len(self.points)
+        assert len(self.xs) >= 3, len(self.xs)
+        assert all(0 <= x <= 1 for x in self.xs), self
+        assert all(0 <= y <= 1 for y in self.ys), self
+
+    @property
+    def points(self) -> List[TextractPoint]:
+        """The points of this polygon as TextractPoint objects."""
+        return [TextractPoint(x, y) for x, y in zip(self.xs, self.ys)]
 
     def get_bounding_box(self) -> TextractBoundingBox:
         """Return a TextractBoundingBox object for this polygon geometry."""
-        x_coords = [p.x for p in self.points]
-        y_coords = [p.y for p in self.points]
+        left, right = min(self.xs), max(self.xs)
+        top, bottom = min(self.ys), max(self.ys)
         bbox_dict = {
-            "Left": min(x_coords),
-            "Top": min(y_coords),
-            "Width": max(x_coords) - min(x_coords),
-            "Height": max(y_coords) - min(y_coords),
+            "Left": left,
+            "Top": top,
+            "Width": right - left,
+            "Height": bottom - top,
         }
         return TextractBoundingBox(bbox_dict)
 
+    def to_points(self, page_width: int, page_height: int) -> str:
+        """Convert this polygon into a string of points."""
+
+        ceil = math.ceil
+        # (joining a list is faster than joining a generator)
+        points = " ".join([
+            f"{ceil(x * page_width)},{ceil(y * page_height)}"
+            for x, y in zip(self.xs, self.ys)
+        ])
+
+        return points
+
 
 class TextractBlock(ABC):
     """Generic Textract block"""
 
+    __slots__ = (
+        "id",
+        "prefix",
+        "_pagexml_id",
+        "geometry",
+        "confidence",
+    )
+
     @abstractmethod
     def __init__(self, aws_block: Dict) -> None:
         self.id = aws_block.get("Id")
@@ -130,6 +215,20 @@ class TextractBlock(ABC):
         self.geometry = build_aws_geometry(aws_block.get("Geometry"))
         self.confidence = float(aws_block.get("Confidence")) / 100
 
+    @property
+    def pagexml_id(self) -> str:
+        """PAGE-XML id of this block, built from its final prefix on first access."""
+        try:
+            return self._pagexml_id
+        except AttributeError:
+            self._pagexml_id = f"{self.prefix}_{self.id}"
+            return self._pagexml_id
+
+    @property
+    def reading_order_id(self) -> str:
+        """Id of the PAGE-XML reading order group of this block."""
+        return f"{self.pagexml_id}_reading-order"
+
 
 class TextractLayout(TextractBlock):
     """Base class for Textract Layout objects.
@@ -151,6 +250,14 @@ class TextractLayout(TextractBlock):
     elements from the next leftmost column are returned in the same way.
     """
 
+    __slots__ = (
+        "page_layout_type",
+        "textract_layout_type",
+        "child_lines",
+        "child_regions",
+        "parent_layout",
+    )
+
     def __init__(
         self, aws_layout_block: Dict,
         aws_top_blocks: Dict,
@@ -166,30 +273,32 @@ class TextractLayout(TextractBlock):
             f"{self.prefix}-{self.textract_layout_type.lower().replace('_','-')}"
         )
 
+        child_ids = get_ids_of_child_blocks(aws_layout_block)
         child_words = [
-            textract_words.get(id)
-            for id in get_ids_of_child_blocks(aws_layout_block)
-            if textract_words.get(id)
+            textract_words[id]
+            for id in child_ids
+            if id in textract_words
         ]
         for word in child_words:
             word.parent_layout = self
 
-        self.child_lines = [
-            textract_lines.get(id)
-            for id in get_ids_of_child_blocks(aws_layout_block)
-            if textract_lines.get(id)
-        ]
-        for word in child_words:
-            if not word.parent_line in self.child_lines:
-                self.child_lines.append(word.parent_line)
+        # dict keeps the lines unique and in order, direct children first
+        self.child_lines = list(
+            dict.fromkeys(
+                chain(
+                    (textract_lines[id] for id in child_ids if id in textract_lines),
+                    (word.parent_line for word in child_words),
+                )
+            )
+        )
 
         for line in self.child_lines:
             line.parent_layout = self
 
         self.child_regions = [
-            aws_top_blocks.get(id)
-            for id in get_ids_of_child_blocks(aws_layout_block)
-            if aws_top_blocks.get(id)
+            aws_top_blocks[id]
+            for id in child_ids
+            if id in aws_top_blocks
         ]
         # layout child blocks must be replaced by child instances later
         # child instances must be connected to parent later
@@ -215,6 +324,17 @@ class TextractTable(TextractBlock):
     PAGE --> TABLES --> <...>
     """
 
+    __slots__ = (
+        "structured",
+        "common_cells",
+        "merged_cells",
+        "common_cells_by_id",
+        "ordered_lines",
+        "rows",
+        "columns",
+        "parent_layout",
+    )
+
     def __init__(
         self,
         aws_table_block: Dict,
@@ -234,30 +354,29 @@ class TextractTable(TextractBlock):
         self.common_cells = []
         self.merged_cells = []
 
-        self.common_cells = [
-            TextractCommonCell(
-                aws_cell_blocks[id],
-                self,
-                aws_selection_element_blocks,
-                textract_words,
-            )
-            for id in get_ids_of_child_blocks(aws_table_block)
-            if aws_cell_blocks.get(id)
-        ]
+        # merged cells refer to common cells, so instantiate them afterwards
+        child_merged_cell_blocks = []
+        for id in get_ids_of_child_blocks(aws_table_block):
+            if id in aws_cell_blocks:
+                self.common_cells.append(
+                    TextractCommonCell(
+                        aws_cell_blocks[id],
+                        self,
+                        aws_selection_element_blocks,
+                        textract_words,
+                    )
+                )
+            elif id in aws_merged_cell_blocks:
+                child_merged_cell_blocks.append(aws_merged_cell_blocks[id])
+        self.common_cells_by_id = {cell.id: cell for cell in self.common_cells}
         self.merged_cells = [
-            TextractMergedCell(
-                aws_merged_cell_blocks[id],
-                self,
-            )
-            for id in get_ids_of_child_blocks(aws_table_block)
-            if aws_merged_cell_blocks.get(id)
+            TextractMergedCell(merged_cell_block, self)
+            for merged_cell_block in child_merged_cell_blocks
         ]
 
-        self.ordered_lines = [
-            line
-            for lines in [cell.child_lines for cell in self.common_cells]
-            for line in lines
-        ]
+        self.ordered_lines = list(
+            chain.from_iterable(cell.child_lines for cell in self.common_cells)
+        )
 
         # store row and col nb
         row_indices = []
@@ -273,6 +392,15 @@ class TextractTable(TextractBlock):
 class TextractLine(TextractBlock):
     """Line class to handle lines detected by AWS Textract."""
 
+    __slots__ = (
+        "text",
+        "child_words",
+        "parent_cell",
+        "parent_layout",
+        "parent_value",
+        "parent_key",
+    )
+
     def __init__(
         self,
         aws_line_block: Dict,
@@ -295,6 +423,19 @@ class TextractLine(TextractBlock):
 class TextractCell(TextractBlock):
     """Cell class to handle cells detected by AWS Textract."""
 
+    __slots__ = (
+        "parent_table",
+        "row_index",
+        "column_index",
+        "row_span",
+        "column_span",
+        "column_header",
+        "table_title",
+        "table_footer",
+        "table_section_title",
+        "table_summary",
+    )
+
     @abstractmethod
     def __init__(self, aws_cell_block: Dict, parent_table: TextractTable) -> None:
         super().__init__(aws_block=aws_cell_block)
@@ -314,23 +455,23 @@ class TextractCell(TextractBlock):
     def get_cell_types(self) -> List[str]:
         """Get all types of this cell as a list. Possible types: table title,
         table footer, section title, table summery, and column header."""
-        types = []
-        if self.table_footer:
-            types.append("table_footer")
-        if self.table_title:
-            types.append("table_title")
-        if self.table_section_title:
-            types.append("section_title")
-        if self.table_summary:
-            types.append("table_summary")
-        if self.column_header:
-            types.append("column_header")
-        return types
+        return [
+            cell_type
+            for attr, cell_type in CELL_TYPE_MAP.items()
+            if getattr(self, attr)
+        ]
 
 
 class TextractCommonCell(TextractCell):
     """Cell class for the  AWS Textract table cells."""
 
+    __slots__ = (
+        "parent_merged_cell",
+        "child_words",
+        "child_lines",
+        "child_selection_elements",
+    )
+
     def __init__(
         self,
         aws_cell_block: Dict,
@@ -343,18 +484,16 @@ class TextractCommonCell(TextractCell):
         self.parent_merged_cell = None
 
         # build child-parent relationships
+        child_ids = get_ids_of_child_blocks(aws_cell_block)
         self.child_words = [
-            textract_words.get(id)
-            for id in get_ids_of_child_blocks(aws_cell_block)
-            if textract_words.get(id)
+            textract_words[id]
+            for id in child_ids
+            if id in textract_words
         ]
         for word in self.child_words:
             word.parent_cell = self
 
-        self.child_lines = []
-        for word in self.child_words:
-            if not word.parent_line in self.child_lines:
-                self.child_lines.append(word.parent_line)
+        self.child_lines = lines_of_words(self.child_words)
         for line in self.child_lines:
             line.parent_cell = self
 
@@ -362,16 +501,23 @@ class TextractCommonCell(TextractCell):
         # this clearly though.
         self.child_selection_elements = [
             TextractSelectionElement(
-                aws_selection_element_blocks.get(id), parent_cell=self
+                aws_selection_element_blocks[id], parent_cell=self
             )
-            for id in get_ids_of_child_blocks(aws_cell_block)
-            if aws_selection_element_blocks.get(id)
+            for id in child_ids
+            if id in aws_selection_element_blocks
         ]
 
 
 class TextractMergedCell(TextractCell):
     """Cell class for the  AWS Textract table merged cells."""
 
+    __slots__ = (
+        "child_cells",
+        "child_words",
+        "child_lines",
+        "child_selection_elements",
+    )
+
     def __init__(
         self,
         aws_cell_block: Dict,
@@ -383,10 +529,10 @@ class TextractMergedCell(TextractCell):
 
         self.child_cells = []
         for cell_block_id in child_cell_ids:
-            for cell in parent_table.common_cells:
-                if cell.id == cell_block_id:
-                    self.child_cells.append(cell)
-                    cell.parent_merged_cell = self
+            cell = parent_table.common_cells_by_id.get(cell_block_id)
+            if cell:
+                self.child_cells.append(cell)
+                cell.parent_merged_cell = self
 
         self.child_words = [
             word for child_cell in self.child_cells for word in child_cell.child_words
@@ -406,6 +552,16 @@ class TextractMergedCell(TextractCell):
 class TextractWord(TextractBlock):
     """Word class for the  AWS Textract words."""
 
+    __slots__ = (
+        "text",
+        "text_type",
+        "parent_line",
+        "parent_cell",
+        "parent_layout",
+        "parent_value",
+        "parent_key",
+    )
+
     def __init__(
         self,
         aws_word_block: Dict,
@@ -429,6 +585,13 @@ class TextractValue(TextractBlock):
 
     https://docs.aws.amazon.com/textract/latest/dg/how-it-works-kvp.html"""
 
+    __slots__ = (
+        "child_selection_elements",
+        "associated_key",
+        "child_words",
+        "child_lines",
+    )
+
     def __init__(
         self,
         aws_key_value_set_block: Dict,
@@ -439,31 +602,29 @@ class TextractValue(TextractBlock):
         if not "VALUE" in aws_key_value_set_block.get("EntityTypes", []):
             raise ValueError("The provided textract block is no VALUE block.")
         self.prefix = f"{self.prefix}-value"
+        child_ids = get_ids_of_child_blocks(aws_key_value_set_block)
 
         # this is probably 1 element at max. Docs don't state
         # this clearly though.
         self.child_selection_elements = [
             TextractSelectionElement(
-                aws_selection_element_blocks.get(id), parent_value=self
+                aws_selection_element_blocks[id], parent_value=self
             )
-            for id in get_ids_of_child_blocks(aws_key_value_set_block)
-            if aws_selection_element_blocks.get(id)
+            for id in child_ids
+            if id in aws_selection_element_blocks
         ]
         self.associated_key = None
 
         # build child-parent relationships
         self.child_words = [
-            textract_words.get(id)
-            for id in get_ids_of_child_blocks(aws_key_value_set_block)
-            if textract_words.get(id)
+            textract_words[id]
+            for id in child_ids
+            if id in textract_words
         ]
         for word in self.child_words:
             word.parent_value = self
 
-        self.child_lines = []
-        for word in self.child_words:
-            if not word.parent_line in self.child_lines:
-                self.child_lines.append(word.parent_line)
+        self.child_lines = lines_of_words(self.child_words)
         for line in self.child_lines:
             line.parent_value = self
         # self.parent_layout = None
@@ -477,6 +638,8 @@ class TextractKey(TextractBlock):
 
     https://docs.aws.amazon.com/textract/latest/dg/how-it-works-kvp.html"""
 
+    __slots__ = ("associated_values", "child_words", "child_lines")
+
     def __init__(
         self,
         aws_key_value_set_block: Dict,
@@ -487,21 +650,10 @@ class TextractKey(TextractBlock):
         if not "KEY" in aws_key_value_set_block.get("EntityTypes", []):
             raise ValueError("The provided textract block is no KEY block.")
         self.prefix = f"{self.prefix}-key"
-        self.child_words = [
-            textract_words.get(id)
-            for id in get_ids_of_child_blocks(aws_key_value_set_block)
-            if textract_words.get(id)
-        ]
-        associated_value_ids = []
-        if any(
-            rel.get("Type") == "VALUE"
-            for rel in aws_key_value_set_block.get("Relationships", [])
-        ):
-            associated_value_ids = [
-                rel.get("Ids", [])
-                for rel in aws_key_value_set_block.get("Relationships", [])
-                if rel["Type"] == "VALUE"
-            ][0]
+        child_ids = get_ids_of_child_blocks(aws_key_value_set_block)
+        associated_value_ids = get_ids_of_related_blocks(
+            aws_key_value_set_block, "VALUE"
+        )
         self.associated_values = [
             textract_values.get(id) for id in associated_value_ids
         ]
@@ -510,17 +662,14 @@ class TextractKey(TextractBlock):
 
         # build child-parent relationships
         self.child_words = [
-            textract_words.get(id)
-            for id in get_ids_of_child_blocks(aws_key_value_set_block)
-            if textract_words.get(id)
+            textract_words[id]
+            for id in child_ids
+            if id in textract_words
         ]
         for word in self.child_words:
             word.parent_key = self
 
-        self.child_lines = []
-        for word in self.child_words:
-            if not word.parent_line in self.child_lines:
-                self.child_lines.append(word.parent_line)
+        self.child_lines = lines_of_words(self.child_words)
         for line in self.child_lines:
             line.parent_key = self
         # self.parent_layout = None
@@ -534,6 +683,8 @@ class TextractSelectionElement(TextractBlock):
     https://docs.aws.amazon.com/textract/latest/dg/how-it-works-selectables.html
     """
 
+    __slots__ = ("selected", "parent_cell", "parent_value")
+
     def __init__(
         self,
         aws_selection_element_block: Dict,
@@ -554,58 +705,40 @@ class TextractSelectionElement(TextractBlock):
             self.parent_value = parent_value
 
 
-@singledispatch
-def points_from_aws_geometry(textract_geom, page_width, page_height):
+def points_from_aws_geometry(
+    textract_geom: TextractGeometry, page_width: int, page_height: int
+) -> str:
     """Convert a Textract geometry into a string of points, which are
     scaled to the image width and height."""
 
-    raise NotImplementedError(
-        f"Cannot process this type of data ({type(textract_geom)})"
-    )
-
-
-@points_from_aws_geometry.register
-def _(textract_geom: TextractBoundingBox, page_width: int, page_height: int) -> str:
-    """Convert a TextractBoundingBox into a string of points in the order top,left
-    top,right bottom,right bottom,left.
-    """
-
-    x1 = math.ceil(textract_geom.left * page_width)
-    y1 = math.ceil(textract_geom.top * page_height)
-    x2 = math.ceil((textract_geom.left + textract_geom.width) * page_width)
-    y2 = y1
-    x3 = x2
-    y3 = math.ceil((textract_geom.top + textract_geom.height) * page_height)
-    x4 = x1
-    y4 = y3
-
-    points = f"{x1},{y1} {x2},{y2} {x3},{y3} {x4},{y4}"
-
-    return points
-
-
-@points_from_aws_geometry.register
-def _(textract_geom: TextractPolygon, page_width: int, page_height: int) -> str:
-    """Convert a TextractPolygon into a string of points."""
-
-    points = " ".join(
-        f"{math.ceil(point.x * page_width)},{math.ceil(point.y * page_height)}"
-        for point in textract_geom.points
-    )
-
-    return points
+    return textract_geom.to_points(page_width, page_height)
 
 
 def build_aws_geometry(aws_block_geometry: Dict) -> TextractGeometry:
     """Build polygon geometry if given in the AWS Textract response, or the
     bounding box geometry otherwise."""
 
-    geometry = None
-    if "Polygon" in aws_block_geometry:
-        geometry = TextractPolygon(aws_block_geometry["Polygon"])
-    else:
-        geometry = TextractBoundingBox(aws_block_geometry["BoundingBox"])
-    return geometry
+    polygon = aws_block_geometry.get("Polygon")
+    if polygon is not None:
+        return TextractPolygon(polygon)
+    return TextractBoundingBox(aws_block_geometry["BoundingBox"])
+
+
+def get_ids_of_related_blocks(aws_block: Dict, relationship_type: str) -> List[str]:
+    """Searches a AWS-Textract-BLOCK for the first Relationship of the given type
+    and returns a list of its Ids, or an empty list otherwise.
+
+    Arguments:
+        aws_block (dict): following AWS-Textract-BLOCK structure
+            (https://docs.aws.amazon.com/textract/latest/dg/API_Block.html)
+        relationship_type (str): type of the Relationship, e.g. CHILD or VALUE
+    Returns:
+        A list of AWS-Textract-BLOCK Ids (can be empty).
+    """
+    for rel in aws_block.get("Relationships", []):
+        if rel.get("Type") == relationship_type:
+            return rel.get("Ids", [])
+    return []
 
 
 def get_ids_of_child_blocks(aws_block: Dict) -> List[str]:
@@ -618,17 +751,20 @@ def get_ids_of_child_blocks(aws_block: Dict) -> List[str]:
     Returns:
         A list of AWS-Textract-BLOCK Ids (can be empty).
     """
-    if not any(
-        rel.get("Type") == "CHILD" for rel in aws_block.get("Relationships", [])
-    ):
-        return []
+    return get_ids_of_related_blocks(aws_block, "CHILD")
+
+
+def lines_of_words(words: List[TextractWord]) -> List[TextractLine]:
+    """Collects the parent lines of the given words, without duplicates
+    and in the order of their first word.
 
-    child_block_ids = [
-        rel.get("Ids", [])
-        for rel in aws_block.get("Relationships", [])
-        if rel["Type"] == "CHILD"
-    ][0]
-    return child_block_ids
+    Arguments:
+        words (list): TextractWord objects with their parent line set
+    Returns:
+        A list of TextractLine objects (can be empty).
+    """
+    # (dict for constant-time membership, unlike list)
+    return list(dict.fromkeys(word.parent_line for word in words))
 
 
 def derive_reading_order(word_list: List[TextractWord]):
@@ -657,6 +793,8 @@ def derive_reading_order(word_list: List[TextractWord]):
     """
 
     top_level_objects_in_reading_order = []
+    # for constant-time membership tests
+    visited_top_level_objects = set()
     for word in word_list:
         if word.parent_line:
             complex_line_parent = next(
@@ -677,7 +815,8 @@ def derive_reading_order(word_list: List[TextractWord]):
                 False,
             )
             if complex_line_parent:
-                if complex_line_parent not in top_level_objects_in_reading_order:
+                if complex_line_parent not in visited_top_level_objects:
+                    visited_top_level_objects.add(complex_line_parent)
                     top_level_objects_in_reading_order.append(complex_line_parent)
 
         complex_word_parent = next(
@@ -695,7 +834,8 @@ def derive_reading_order(word_list: List[TextractWord]):
         )
 
         if complex_word_parent:
-            if complex_word_parent not in top_level_objects_in_reading_order:
+            if complex_word_parent not in visited_top_level_objects:
+                visited_top_level_objects.add(complex_word_parent)
                 top_level_objects_in_reading_order.append(complex_word_parent)
 
     return top_level_objects_in_reading_order
@@ -716,10 +856,12 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
         out_path (str): path to output XML file
     """
 
-    print(f"beginning converting {json_path}")
-    json_file = open(json_path, "r", encoding="utf-8")
-    aws_json = json.load(json_file)
-    json_file.close()
+    LOG.info("beginning converting %s", json_path)
+    with open(json_path, "rb") as json_file:
+        if orjson:
+            aws_json = orjson.loads(json_file.read())
+        else:
+            aws_json = json.load(json_file)
 
     # --------------------------------------------------------------------------
     # setup: read textract blocks
@@ -737,33 +879,35 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
         key_value_set_blocks,
         layout_blocks,
     ) = ({}, {}, {}, {}, {}, {}, {}, {}, {}, {}, {})
+    blocks_by_type = {
+        "LINE": line_blocks,
+        "WORD": word_blocks,
+        "TABLE": table_blocks,
+        "CELL": cell_blocks,
+        "MERGED_CELL": merged_cell_blocks,
+        "TABLE_TITLE": table_title_blocks,
+        "TABLE_FOOTER": table_footer_blocks,
+        "SELECTION_ELEMENT": selection_element_blocks,
+        "KEY_VALUE_SET": key_value_set_blocks,
+    }
     block_order = {}
     for order, block in enumerate(aws_json["Blocks"]):
-        block_order[block["Id"]] = order
-        if block["BlockType"] == "PAGE":
+        # intern ids, as they are used as dict keys throughout (so lookups
+        # of ids from relationships can compare by identity)
+        block_id = block["Id"] = sys.intern(block["Id"])
+        for relationship in block.get("Relationships", []):
+            relationship["Ids"] = [sys.intern(id_) for id_ in relationship.get("Ids", [])]
+        block_order[block_id] = order
+        block_type = block["BlockType"]
+        blocks = blocks_by_type.get(block_type)
+        if blocks is not None:
+            blocks[block_id] = block
+        elif block_type == "PAGE":
             assert not page_block, "page must not have more than 1 PAGE block"
             page_block = block
-        if block["BlockType"] == "LINE":
-            line_blocks[block["Id"]] = block
-        if block["BlockType"] == "WORD":
-            word_blocks[block["Id"]] = block
-        if block["BlockType"] == "TABLE":
-            table_blocks[block["Id"]] = block
-        if block["BlockType"] == "CELL":
-            cell_blocks[block["Id"]] = block
-        if block["BlockType"] == "MERGED_CELL":
-            merged_cell_blocks[block["Id"]] = block
-        if block["BlockType"] == "TABLE_TITLE":
-            table_title_blocks[block["Id"]] = block
-        if block["BlockType"] == "TABLE_FOOTER":
-            table_footer_blocks[block["Id"]] = block
-        if block["BlockType"] == "SELECTION_ELEMENT":
-            selection_element_blocks[block["Id"]] = block
-        if block["BlockType"] == "KEY_VALUE_SET":
-            key_value_set_blocks[block["Id"]] = block
         # we handle layout somewhat different
-        if block["BlockType"].startswith("LAYOUT_"):
-            layout_blocks[block["Id"]] = block
+        elif block_type.startswith("LAYOUT_"):
+            layout_blocks[block_id] = block
 
     # build words
     words = {}
@@ -853,13 +997,21 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
 
         # if word is neither part of a line, table, nor layout,
         # create dummy line around the word
-        dummy_block = dict(word_blocks[word.id])
-        dummy_block["Id"] = word.id + "_parent"
+        # (only copy the fields TextractLine reads)
+        word_block = word_blocks[word.id]
+        dummy_block = {
+            "Id": word.id + "_parent",
+            "BlockType": "LINE",
+            "Geometry": word_block["Geometry"],
+            "Confidence": word_block["Confidence"],
+            "Text": word_block.get("Text"),
+        }
         dummy = TextractLine(dummy_block, {})
         dummy.child_words = [word]
         word.parent_line = dummy
         block_order[dummy.id] = block_order[word.id]
-        lines.append(dummy)
+        line_blocks[dummy.id] = dummy_block
+        lines[dummy.id] = dummy
 
     # build dummy layouts for dangling lines
     for line in lines.values():
@@ -873,9 +1025,14 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
 
         # if line is neither part of a table, nor of a layout,
         # create dummy region around the line
-        dummy_block = dict(line_blocks[line.id])
-        dummy_block["Id"] = line.id + "_parent"
-        dummy_block["BlockType"] = "LAYOUT_DUMMY"
+        # (only copy the fields TextractLayout reads)
+        line_block = line_blocks[line.id]
+        dummy_block = {
+            "Id": line.id + "_parent",
+            "BlockType": "LAYOUT_DUMMY",
+            "Geometry": line_block["Geometry"],
+            "Confidence": line_block["Confidence"],
+        }
         dummy = TextractLayout(dummy_block, {}, {}, {})
         dummy.child_lines = [line]
         line.parent_layout = dummy
@@ -886,43 +1043,45 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
     # - derived from linear word-order (as fall-back)
     text_regions = derive_reading_order(words.values())
     # - taken from top level directly (only useful with LAYOUT results)
-    if any(layouts):
+    if layouts:
         def aws_block_order(obj):
             return block_order[obj.id]
         layout_regions = sorted(layouts.values(), key=aws_block_order)
+        text_region_positions = {
+            region: pos for pos, region in enumerate(text_regions)
+        }
         # tables are special:
         for table in tables.values():
             layout_pos = -1
             # try to find matching LAYOUT_TABLE
-            for layout in layout_regions:
+            for pos, layout in enumerate(layout_regions):
                 if layout.geometry == table.geometry:
-                    layout_pos = layout_regions.index(layout)
+                    layout_pos = pos
                     layout_regions[layout_pos] = table
                     break
             if layout_pos > -1:
                 continue
             # or re-use prior/next relations in word-based order
-            text_pos = text_regions.index(table)
+            text_pos = text_region_positions[table]
             if text_pos > 0:
                 # insert after predecessor
                 layout_pos = layout_regions.index(text_regions[text_pos - 1]) + 1
             else:
                 # insert before successor
                 layout_pos = layout_regions.index(text_regions[text_pos + 1]) + 1
-            layout_regions = layout_regions[:layout_pos] + [table] + layout_regions[layout_pos:]
+            layout_regions.insert(layout_pos, table)
         textract_objects_in_reading_order = layout_regions
     else:
         textract_objects_in_reading_order = text_regions
 
     # build PRIMAPageXML
-    pil_img = Image.open(img_path)
-    img_width = pil_img.width
-    img_height = pil_img.height
-    pil_img.close()
+    # (only parses the image header, no pixel data is decoded)
+    with Image.open(img_path) as pil_img:
+        img_width, img_height = pil_img.size
     now = datetime.now()
     page_content_type = PcGtsType(
         Metadata=MetadataType(
-            Creator="OCR-D/core %s" % VERSION, Created=now, LastChange=now
+            Creator=CREATOR, Created=now, LastChange=now
         )
     )
     pagexml_page = PageType(
@@ -947,12 +1106,12 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
         if table:
             local_reading_order = UnorderedGroupIndexedType(
                 index=global_reading_order_index,
-                id=f"{table.prefix}_{table.id}_reading-order",
+                id=table.reading_order_id,
                 comments="Reading order of this table.",
-                regionRef=f"{table.prefix}_{table.id}",
+                regionRef=table.pagexml_id,
             )
             global_ordered_group.add_UnorderedGroupIndexed(local_reading_order)
-            local_reading_orders[f"{table.prefix}_{table.id}_reading-order"] = (
+            local_reading_orders[table.reading_order_id] = (
                 local_reading_order
             )
         elif layout and (
@@ -960,36 +1119,50 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
                 len(layout.child_regions)):
             local_reading_order = OrderedGroupIndexedType(
                 index=global_reading_order_index,
-                id=f"{layout.prefix}_{layout.id}_reading-order",
+                id=layout.reading_order_id,
                 comments="Reading order of this region.",
-                regionRef=f"{layout.prefix}_{layout.id}",
+                regionRef=layout.pagexml_id,
             )
             global_ordered_group.add_OrderedGroupIndexed(local_reading_order)
-            local_reading_orders[f"{layout.prefix}_{layout.id}_reading-order"] = (
+            local_reading_orders[layout.reading_order_id] = (
                 local_reading_order
             )
         else:
             global_ordered_group.add_RegionRefIndexed(
                 RegionRefIndexedType(
                     index=global_reading_order_index,
-                    regionRef=f"{textract_object.prefix}_{textract_object.id}",
+                    regionRef=textract_object.pagexml_id,
                 )
             )
 
+    # points strings of block geometries, as lines are rendered repeatedly
+    # (inside figures and in every table cell they span)
+    block_points_cache = {}
+
+    def block_points(block):
+        points = block_points_cache.get(block.id)
+        if points is None:
+            points = block.geometry.to_points(img_width, img_height)
+            block_points_cache[block.id] = points
+        return points
+
     def instantiate_pagexml(block, parent):
+        # handle tables
+        if isinstance(block, TextractLayout) and block.textract_layout_type == "LAYOUT_TABLE":
+            # we covered tables already
+            return None
+
         local_reading_order_index = 0
         local_block_reading_order = local_reading_orders.get(
-            f"{block.prefix}_{block.id}_reading-order", None
+            block.reading_order_id, None
         )
 
         # generic arguments
         kwargs = {'Coords':
                   CoordsType(
-                      points=points_from_aws_geometry(
-                          block.geometry, img_width, img_height
-                      )
+                      points=block_points(block)
                   ),
-                  'id': f"{block.prefix}_{block.id}",
+                  'id': block.pagexml_id,
         }
 
         # handle figures
@@ -1006,9 +1179,7 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
                 line_region_id = f"{line.prefix}_text-region_{line.id}"
                 pagexml_line_region = TextRegionType(
                     Coords=CoordsType(
-                        points=points_from_aws_geometry(
-                            line.geometry, img_width, img_height
-                        )
+                        points=block_points(line)
                     ),
                     id=line_region_id,
                 )
@@ -1031,11 +1202,6 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
 
             return pagexml_img_region
 
-        # handle tables
-        if isinstance(block, TextractLayout) and block.textract_layout_type == "LAYOUT_TABLE":
-            # we covered tables already
-            return None
-
         if isinstance(block, TextractLine):
             pagexml_text_line = TextLineType(**kwargs)
             if block.text:
@@ -1061,9 +1227,11 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
         if isinstance(block, TextractLayout) and block.textract_layout_type.startswith('LAYOUT_'):
             pagexml_text_region = TextRegionType(type_=block.page_layout_type, **kwargs)
             if block.textract_layout_type != "LAYOUT_DUMMY":
-                pagexml_text_region.set_custom(
-                    f"textract-layout-type: {block.textract_layout_type.split('LAYOUT_')[1].lower()};"
-                )
+                custom = LAYOUT_CUSTOM_MAP.get(block.textract_layout_type)
+                if custom is None:
+                    # layout type unknown to LAYOUT_TYPE_MAP
+                    custom = f"textract-layout-type: {block.textract_layout_type.split('LAYOUT_')[1].lower()};"
+                pagexml_text_region.set_custom(custom)
             parent.add_TextRegion(pagexml_text_region)
 
             for line in block.child_lines:
@@ -1105,9 +1273,7 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
                 cell_region_id = f"{cell.prefix}_text-region_{cell.id}"
                 pagexml_cell_region = TextRegionType(
                     Coords=CoordsType(
-                        points=points_from_aws_geometry(
-                            cell.geometry, img_width, img_height
-                        )
+                        points=block_points(cell)
                     ),
                     id=cell_region_id,
                 )
@@ -1140,9 +1306,7 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
 
                     pagexml_text_line = TextLineType(
                         Coords=CoordsType(
-                            points=points_from_aws_geometry(
-                                line.geometry, img_width, img_height
-                            )
+                            points=block_points(line)
                         ),
                         id=f"{line.prefix}_{line.id}-{cell.row_index}-{cell.column_index}",
                     )
@@ -1156,9 +1320,7 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
                     for word in line.child_words:
                         pagexml_word = WordType(
                             Coords=CoordsType(
-                                points=points_from_aws_geometry(
-                                    word.geometry, img_width, img_height
-                                )
+                                points=block_points(word)
                             ),
                             id=f"{word.prefix}_{word.id}-{cell.row_index}-{cell.column_index}",
                             production=word.text_type,
@@ -1186,4 +1348,4 @@ def convert_file(json_path: str, img_path: str, out_path: str) -> None:
 
     with open(out_path, "w", encoding="utf-8") as out_file:
         out_file.write(result)
-        print(f"  finished writing {out_path}\n")
+    LOG.info("finished writing %s", out_path)